@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from catalog_store import DEFAULT_CATALOG_PATH
 from game_recommender import GameRecommender
 import pandas as pd
 from tkinter import filedialog
@@ -220,13 +222,14 @@ class MetacriticGUI:
     def scrape_urls(self, urls):
         """Scrape URLs in a separate thread"""
         try:
-            from metacritic import scrape_multiple_games, save_to_csv, validate_metacritic_url
+            from metacritc import scrape_metacritic, save_to_csv, refresh_catalog, validate_metacritic_url
             
             invalid_urls = [url for url in urls if not validate_metacritic_url(url)]
             if invalid_urls:
                 self.set_status("Invalid URLs detected")
+                invalid_list = "\n".join(invalid_urls)
                 messagebox.showwarning("Invalid URLs", 
-                    f"Some URLs are invalid and will be skipped:\n{'n'.join(invalid_urls)}")
+                    f"Some URLs are invalid and will be skipped:\n{invalid_list}")
                 return
             
             total = len(urls)
@@ -234,20 +237,16 @@ class MetacriticGUI:
             
             def update_progress(future):
                 nonlocal processed
-                processed =+ 1
+                processed += 1
                 self.progress_var.set((processed/total) * 100)
-                self.status(f"Processed {processed}/{total} URLs")
-            
-            for i, url in enumerate(urls, 1):
-                self.progress_var.set((i / total) * 100)
-                self.set_status(f"Scraping {i}/{total}: {url}")
+                self.set_status(f"Processed {processed}/{total} URLs")
                 
             with ThreadPoolExecutor(max_workers=5) as executor:
                 futures = []
                 for url in urls:
                     future = executor.submit(scrape_metacritic, url)
                     future.add_done_callback(update_progress)
-                    futures.add(future)
+                    futures.append(future)
                     
                 results = []
                 for future in futures:
@@ -260,6 +259,10 @@ class MetacriticGUI:
                         
                 if results:
                     save_to_csv(results)
+                    delta = refresh_catalog(results)
+                    # Patch a trained recommender on the Tk thread, which also serves queries
+                    if delta and self.recommender is not None and self.recommender.serving_index is not None:
+                        self.root.after(0, self.recommender.apply_delta, delta)
                     self.set_status("Scraping completed successfully!")
                     messagebox.showinfo("Success", 
                         f"Successfully scraped {len(results)} games!")
@@ -283,14 +286,15 @@ class MetacriticGUI:
             return
             
         try:
-            # Check if data file exists
-            if not os.path.exists('output.csv'):
+            # Check if the catalog exists
+            if not os.path.exists(DEFAULT_CATALOG_PATH):
                 messagebox.showerror("No Data", 
                     "Please scrape some games first before getting recommendations.")
                 return
                 
+            # Later scrapes are applied to the trained model as catalog deltas
             if not self.recommender:
-                self.recommender = GameRecommender('output.csv')
+                self.recommender = GameRecommender(catalog_path=DEFAULT_CATALOG_PATH)
                 self.recommender.train_model()
                 
             # Get preferences
@@ -0,0 +1,80 @@
+import logging
+
+from catalog_store import record_hash
+
+
+class CatalogDelta:
+    """
+    Changes between a scrape refresh and the stored catalog.
+
+    inserts and updates hold the newly scraped records, deletes holds the
+    URLs of stored games that were retired.
+    """
+
+    def __init__(self, inserts=None, updates=None, deletes=None, unchanged=0):
+        self.inserts = inserts or []
+        self.updates = updates or []
+        self.deletes = deletes or []
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def changed_urls(self):
+        """URLs of inserted and updated records."""
+        return [record["URL"] for record in self.inserts + self.updates]
+
+    def summary(self):
+        return (f"{len(self.inserts)} inserted, {len(self.updates)} updated, "
+                f"{len(self.deletes)} deleted, {self.unchanged} unchanged")
+
+    def report(self):
+        """Human-readable list of every change."""
+        lines = [self.summary()]
+        for label, records in [("+", self.inserts), ("~", self.updates)]:
+            for record in records:
+                lines.append(f"{label} {record.get('Title')} ({record['URL']})")
+        for url in self.deletes:
+            lines.append(f"- {url}")
+        return "\n".join(lines)
+
+
+def diff_records(store, records, retired_urls=None):
+    """
+    Compare newly scraped records to the catalog using content hashes.
+
+    Deletes are only reported for stored games listed in retired_urls, so
+    a refresh of part of the catalog never removes games from elsewhere.
+    A URL scraped more than once in a refresh keeps its last record, as in
+    ScrapeCoordinator.merge_outputs.
+    """
+    stored = store.content_hashes()
+    latest = {}
+    for record in records:
+        url = record.get("URL")
+        if url:
+            latest[url] = record
+
+    delta = CatalogDelta()
+    for url, record in latest.items():
+        if url not in stored:
+            delta.inserts.append(record)
+        elif stored[url] != record_hash(record):
+            delta.updates.append(record)
+        else:
+            delta.unchanged += 1
+
+    if retired_urls is not None:
+        delta.deletes = [url for url in dict.fromkeys(retired_urls)
+                         if url in stored and url not in latest]
+
+    return delta
+
+
+def apply_delta(store, delta):
+    """Write a delta to the catalog store."""
+    if delta.inserts or delta.updates:
+        store.upsert(delta.inserts + delta.updates)
+    if delta.deletes:
+        store.delete(delta.deletes)
+    logging.info(f"Applied catalog delta: {delta.summary()}")
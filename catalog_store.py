@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime
+
+from db_connection import connect, write_transaction
+
+# Constants
+DEFAULT_CATALOG_PATH = "catalog.db"
+DATE_FORMATS = ["%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%m/%d/%Y"]
+# SQLite's default limit on host parameters is 999 on older builds
+MAX_QUERY_PARAMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    metascore REAL,
+    user_score REAL,
+    publisher TEXT,
+    developers TEXT,
+    genres TEXT,
+    release_date TEXT,
+    release_year INTEGER,
+    platforms TEXT,
+    content_hash TEXT,
+    updated_at REAL
+);
+"""
+
+# Catalog columns in the order the scraper produces them
+COLUMNS = [
+    ("URL", "url"),
+    ("Title", "title"),
+    ("Metascore", "metascore"),
+    ("User Score", "user_score"),
+    ("Publisher", "publisher"),
+    ("Developers", "developers"),
+    ("Genres", "genres"),
+    ("Release Date", "release_date"),
+    ("Platforms", "platforms"),
+]
+
+
+def record_hash(record):
+    """Hash of a scraped record's content, used to detect changed records."""
+    content = [str(record.get(name) or "") for name, _ in COLUMNS]
+    return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def _parse_score(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_year(release_date):
+    """
+    Release year of a scraped release date, or None.
+    Shared by the catalog and GameRecommender so both agree on year filters.
+    """
+    if not isinstance(release_date, str) or not release_date:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(release_date, fmt).year
+        except ValueError:
+            continue
+    match = re.search(r"\b(19|20)\d{2}\b", release_date)
+    return int(match.group(0)) if match else None
+
+
+class CatalogStore:
+    """
+    SQLite catalog of scraped games keyed by URL.
+
+    Recommendation filters are answered by GameRecommender's in-memory
+    serving index, so the catalog only needs its URL key.
+    """
+
+    def __init__(self, db_path=DEFAULT_CATALOG_PATH):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.executescript(SCHEMA)
+
+    def upsert(self, records):
+        """
+        Insert or update scraped records, keyed by URL.
+        Returns the number of records written.
+        """
+        now = time.time()
+        written = 0
+        with write_transaction(self.db_path) as conn:
+            for record in records:
+                url = record.get("URL")
+                if not url:
+                    continue
+                row = (
+                    url,
+                    record.get("Title"),
+                    _parse_score(record.get("Metascore")),
+                    _parse_score(record.get("User Score")),
+                    record.get("Publisher"),
+                    record.get("Developers"),
+                    record.get("Genres"),
+                    record.get("Release Date"),
+                    parse_year(record.get("Release Date")),
+                    record.get("Platforms"),
+                    record_hash(record),
+                    now,
+                )
+                conn.execute(
+                    """INSERT INTO games (url, title, metascore, user_score, publisher,
+                                          developers, genres, release_date, release_year,
+                                          platforms, content_hash, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (url) DO UPDATE SET
+                           title = excluded.title,
+                           metascore = excluded.metascore,
+                           user_score = excluded.user_score,
+                           publisher = excluded.publisher,
+                           developers = excluded.developers,
+                           genres = excluded.genres,
+                           release_date = excluded.release_date,
+                           release_year = excluded.release_year,
+                           platforms = excluded.platforms,
+                           content_hash = excluded.content_hash,
+                           updated_at = excluded.updated_at""",
+                    row
+                )
+                written += 1
+
+        logging.info(f"Upserted {written} games into {self.db_path}")
+        return written
+
+    def delete(self, urls):
+        """Delete games by URL. Returns the number of games removed."""
+        urls = list(urls)
+        deleted = 0
+        with write_transaction(self.db_path) as conn:
+            for i in range(0, len(urls), MAX_QUERY_PARAMS):
+                chunk = urls[i:i + MAX_QUERY_PARAMS]
+                cursor = conn.execute(
+                    "DELETE FROM games WHERE url IN (%s)" % ", ".join("?" * len(chunk)),
+                    chunk
+                )
+                deleted += cursor.rowcount
+
+        logging.info(f"Deleted {deleted} games from {self.db_path}")
+        return deleted
+
+    def content_hashes(self):
+        """Return a dict of URL to stored content hash."""
+        with connect(self.db_path) as conn:
+            return {row["url"]: row["content_hash"]
+                    for row in conn.execute("SELECT url, content_hash FROM games")}
+
+    def load_records(self, urls=None):
+        """
+        Return games as dicts with the scraper's column names plus 'Game ID',
+        ordered by id. If urls is given, only those games are loaded.
+        """
+        select = ", ".join(column for _, column in COLUMNS)
+        query = f"SELECT id, {select} FROM games"
+        with connect(self.db_path) as conn:
+            if urls is None:
+                rows = conn.execute(query + " ORDER BY id").fetchall()
+            else:
+                urls = list(urls)
+                rows = []
+                for i in range(0, len(urls), MAX_QUERY_PARAMS):
+                    chunk = urls[i:i + MAX_QUERY_PARAMS]
+                    rows.extend(conn.execute(
+                        query + " WHERE url IN (%s)" % ", ".join("?" * len(chunk)),
+                        chunk
+                    ))
+                rows.sort(key=lambda row: row["id"])
+
+        records = []
+        for row in rows:
+            record = {"Game ID": row["id"]}
+            for name, column in COLUMNS:
+                record[name] = row[column]
+            records.append(record)
+        return records
+
+    def count(self):
+        with connect(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
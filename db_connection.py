@@ -0,0 +1,39 @@
+import sqlite3
+from contextlib import contextmanager
+
+
+def _open(db_path):
+    # Autocommit mode: transactions are only opened explicitly by write_transaction
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@contextmanager
+def connect(db_path):
+    """Connection for reads and schema setup; each statement commits on its own."""
+    conn = _open(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def write_transaction(db_path):
+    """
+    Connection whose statements run in one transaction, committed on success
+    and rolled back on error. BEGIN IMMEDIATE takes the write lock up front,
+    so concurrent writers queue instead of interleaving.
+    """
+    conn = _open(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
@@ -2,24 +2,42 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
-from sklearn.metrics.pairwise import cosine_similarity
 import re
+from catalog_store import COLUMNS, CatalogStore, parse_year
+from serving_index import ServingIndex
 
 class GameRecommender:
-    def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path)
+    def __init__(self, csv_path=None, catalog_path=None):
+        if csv_path is None and catalog_path is None:
+            raise ValueError("Either csv_path or catalog_path must be given")
+        self.csv_path = csv_path
+        self.catalog = CatalogStore(catalog_path) if catalog_path is not None else None
+        self.df = self._load_data()
         self.preprocessed_data = None
         self.kmeans_model = None
         self.n_clusters = None
         self.feature_matrix = None
+        self.feature_columns = None
+        self.serving_index = None
+        self.scaler = None
         
-    def preprocess_data(self):
+    def _load_data(self):
+        # Load from the SQLite catalog when given, otherwise from a scraped CSV
+        if self.catalog is not None:
+            return pd.DataFrame(self.catalog.load_records())
+        return pd.read_csv(self.csv_path)
+        
+    def _prepare_columns(self, df):
         # Convert scores to numerical values
-        self.df['Metascore'] = pd.to_numeric(self.df['Metascore'], errors='coerce')
-        self.df['User Score'] = pd.to_numeric(self.df['User Score'], errors='coerce')
+        df['Metascore'] = pd.to_numeric(df['Metascore'], errors='coerce')
+        df['User Score'] = pd.to_numeric(df['User Score'], errors='coerce')
         
         # Process release dates
-        self.df['Release Year'] = pd.to_datetime(self.df['Release Date'], errors='coerce').dt.year
+        df['Release Year'] = pd.to_numeric(df['Release Date'].map(parse_year), errors='coerce')
+        return df
+        
+    def preprocess_data(self):
+        self._prepare_columns(self.df)
         
         # Create genre features using one-hot encoding
         genres = self.df['Genres'].str.get_dummies(sep=', ')
@@ -31,8 +49,8 @@ class GameRecommender:
         numerical_features = self.df[['Metascore', 'User Score', 'Release Year']].fillna(0)
         
         # Standardize numerical features
-        scaler = StandardScaler()
-        scaled_numerical = scaler.fit_transform(numerical_features)
+        self.scaler = StandardScaler()
+        scaled_numerical = self.scaler.fit_transform(numerical_features)
         scaled_numerical_df = pd.DataFrame(
             scaled_numerical,
             columns=numerical_features.columns
@@ -43,10 +61,76 @@ class GameRecommender:
             [scaled_numerical_df, genres, platforms],
             axis=1
         )
+        self.feature_columns = self.feature_matrix.columns
         
         return self.feature_matrix
     
-    def train_model(self, n_clusters=8):
+    def _encode_features(self, df):
+        """
+        Encode rows with the fitted scaler and the trained genre/platform columns.
+        Genres or platforms unseen at training time are ignored until the next retrain.
+        """
+        numerical_features = df[['Metascore', 'User Score', 'Release Year']].fillna(0)
+        scaled_numerical_df = pd.DataFrame(
+            self.scaler.transform(numerical_features),
+            columns=numerical_features.columns,
+            index=df.index
+        )
+        
+        features = pd.concat(
+            [
+                scaled_numerical_df,
+                df['Genres'].str.get_dummies(sep=', '),
+                df['Platforms'].str.get_dummies(sep=', ')
+            ],
+            axis=1
+        )
+        features = features.reindex(columns=self.feature_columns, fill_value=0)
+        return features.astype(np.float64)
+    
+    def apply_delta(self, delta):
+        """
+        Update a trained model with a catalog delta instead of retraining.
+        Only inserted and updated games are encoded and assigned to their
+        nearest existing cluster, and the serving index is patched in place.
+        A kept DataFrame still describes the catalog as it was trained.
+        """
+        if self.serving_index is None:
+            raise ValueError("The model must be trained before applying a delta")
+        
+        if self.catalog is not None:
+            records = self.catalog.load_records(urls=delta.changed_urls())
+        else:
+            records = delta.inserts + delta.updates
+        changed = self._prepare_columns(pd.DataFrame(records, columns=[name for name, _ in COLUMNS]))
+        
+        features = np.empty((0, len(self.feature_columns)))
+        labels = np.empty(0, dtype=np.int32)
+        if len(changed) > 0:
+            features = self._encode_features(changed)
+            labels = self.kmeans_model.predict(features)
+        
+        self.serving_index.update(
+            removed_urls=delta.deletes + delta.changed_urls(),
+            features=np.asarray(features),
+            labels=labels,
+            urls=changed['URL'].tolist(),
+            titles=changed['Title'].tolist(),
+            genres=changed['Genres'].tolist(),
+            platforms=changed['Platforms'].tolist(),
+            metascores=changed['Metascore'].values,
+            years=changed['Release Year'].values
+        )
+        return delta
+    
+    def train_model(self, n_clusters=8, keep_training_data=False):
+        """
+        Cluster the catalog and build the serving index that answers queries.
+        The DataFrame and feature matrix are released afterwards unless
+        keep_training_data is set, which analyze_clusters needs.
+        """
+        if self.df is None:
+            self.df = self._load_data()
         if self.feature_matrix is None:
             self.preprocess_data()
             
@@ -60,40 +144,97 @@ class GameRecommender:
         # Fit the model and add cluster labels to the dataframe
         self.df['Cluster'] = self.kmeans_model.fit_predict(self.feature_matrix)
         
-    def get_recommendations(self, game_title, n_recommendations=5):
-        # Find the game in our dataset
-        game_idx = self.df[self.df['Title'].str.contains(game_title, case=False, na=False)].index
+        # Compact layout used to answer queries
+        self._build_serving_index()
+        if not keep_training_data:
+            self.release_training_data()
         
-        if len(game_idx) == 0:
-            return
-            
-        game_idx = game_idx[0]
-        game_cluster = self.df.loc[game_idx, 'Cluster']
+    def get_recommendations(self, game_title, n_recommendations=5, platforms=None, genres=None,
+                            min_metascore=None, max_metascore=None, min_year=None, max_year=None):
+        if self.serving_index is None:
+            self.train_model()
+        index = self.serving_index
         
-        # Get games from the same cluster
-        cluster_games = self.df[self.df['Cluster'] == game_cluster]
+        # Find the game in our dataset
+        position = index.find(game_title)
         
-        # Calculate similarity scores within the cluster
-        game_features = self.feature_matrix.iloc[game_idx].values.reshape(1, -1)
-        cluster_features = self.feature_matrix.iloc[cluster_games.index]
+        if position is None:
+            return
         
-        similarities = cosine_similarity(game_features, cluster_features)[0]
+        # Narrow the game's cluster to the filtered candidates before computing similarity
+        candidates = self._filter_candidates(
+            position,
+            platforms=platforms,
+            genres=genres,
+            min_metascore=min_metascore,
+            max_metascore=max_metascore,
+            min_year=min_year,
+            max_year=max_year
+        )
         
-        # Get top N similar games
-        similar_game_indices = similarities.argsort()[::-1][1:n_recommendations+1]
+        # Get top N similar games within the cluster
+        similar_positions, similarities = index.most_similar(
+            position, n_recommendations, candidates
+        )
         
         recommendations = []
-        for idx, similarity in zip(similar_game_indices, similarities[similar_game_indices]):
+        for similar, similarity in zip(similar_positions, similarities):
             recommendations.append({
-                'title': self.df.iloc[cluster_games.index[idx]]['Title'],
-                'similarity_score': round(similarity * 100, 2),
-                'metascore': self.df.iloc[cluster_games.index[idx]]['Metascore'],
-                'genres': self.df.iloc[cluster_games.index[idx]]['Genres']
+                'title': index.title(similar),
+                'similarity_score': round(float(similarity) * 100, 2),
+                'metascore': float(index.metascore(similar)),
+                'genres': index.genres(similar)
             })
             
         return recommendations
     
+    def _filter_candidates(self, position, platforms=None, genres=None, min_metascore=None,
+                           max_metascore=None, min_year=None, max_year=None):
+        """
+        Return the sorted serving index positions of games in the same
+        cluster as position that match the filters, or None if no filter
+        was given. Filters are answered from the in-memory arrays of that
+        cluster only, for both CSV and catalog backed recommenders.
+        """
+        start, end = self.serving_index.cluster_range(position)
+        return self.serving_index.filter_positions(
+            start,
+            end,
+            platforms=platforms,
+            genres=genres,
+            min_metascore=min_metascore,
+            max_metascore=max_metascore,
+            min_year=min_year,
+            max_year=max_year
+        )
+    
+    def _build_serving_index(self):
+        self.serving_index = ServingIndex.build(
+            features=self.feature_matrix.to_numpy(dtype=np.float32),
+            labels=self.df['Cluster'].values,
+            n_clusters=self.n_clusters,
+            urls=self.df['URL'].tolist(),
+            titles=self.df['Title'].tolist(),
+            genres=self.df['Genres'].tolist(),
+            platforms=self.df['Platforms'].tolist(),
+            metascores=self.df['Metascore'].values,
+            years=self.df['Release Year'].values
+        )
+        return self.serving_index
+    
+    def release_training_data(self):
+        """
+        Drop the DataFrame and feature matrix, keeping only the serving index.
+        analyze_clusters needs the DataFrame; train_model reloads it.
+        """
+        if self.serving_index is None:
+            self.train_model()
+        self.df = None
+        self.feature_matrix = None
+    
     def analyze_clusters(self):
+        if self.df is None:
+            raise ValueError("Training data was released; train with keep_training_data=True")
         cluster_analysis = {}
         
         for cluster in range(self.n_clusters):
@@ -122,7 +263,7 @@ class GameRecommender:
 if __name__ == "__main__":
     # Initialize and train the recommender
     recommender = GameRecommender("output.csv")
-    recommender.train_model(n_clusters=8)
+    recommender.train_model(n_clusters=8, keep_training_data=True)
     
     # Get recommendations for a specific game
     recommendations = recommender.get_recommendations("The Legend of Zelda")
@@ -5,6 +5,9 @@ from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
 import random
+import sqlite3
+from catalog_store import CatalogStore, DEFAULT_CATALOG_PATH
+from catalog_diff import apply_delta, diff_records
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -97,6 +100,24 @@ def save_to_csv(data, filename="output.csv"):
         logging.error(f"Failed to save data to {filename}: {e}")
 
 
+def refresh_catalog(data, retired_urls=None, db_path=DEFAULT_CATALOG_PATH):
+    """
+    Writes only the records that changed since the last scrape to the catalog.
+    Games are only deleted if their URL is in retired_urls. Returns the delta,
+    or None if the catalog could not be updated.
+    """
+    try:
+        store = CatalogStore(db_path)
+        delta = diff_records(store, data, retired_urls)
+        apply_delta(store, delta)
+    except sqlite3.Error as e:
+        logging.error(f"Failed to refresh {db_path}: {e}")
+        return None
+
+    logging.info(f"Catalog refresh: {delta.report()}")
+    return delta
+
+
 def main():
     """
     Main function with options for manual entry or file-based scraping.
@@ -105,7 +126,8 @@ def main():
         print("\nMetacritic Web Scraper")
         print("1. Enter URLs manually")
         print("2. Load URLs from a file")
-        print("3. Quit")
+        print("3. Retire games listed in a file")
+        print("4. Quit")
 
         choice = input("Enter your choice: ").strip()
 
@@ -124,6 +146,7 @@ def main():
             if urls:
                 all_data = scrape_multiple_games(urls)
                 save_to_csv(all_data)
+                refresh_catalog(all_data)
 
         elif choice == "2":
             try:
@@ -132,12 +155,24 @@ def main():
                 if urls:
                     all_data = scrape_multiple_games(urls)
                     save_to_csv(all_data)
+                    refresh_catalog(all_data)
             except FileNotFoundError:
                 print(f"File not found: {file_path}")
             except Exception as e:
                 logging.error(f"An error occurred while reading the file: {e}")
 
         elif choice == "3":
+            file_path = input("File of URLs to retire: ").strip()
+            try:
+                with open(file_path, "r") as file:
+                    retired_urls = [line.strip() for line in file if line.strip()]
+                delta = refresh_catalog([], retired_urls)
+                if delta is not None:
+                    print(delta.report())
+            except FileNotFoundError:
+                print(f"File not found: {file_path}")
+
+        elif choice == "4":
             print("Exiting the scraper. Goodbye!")
             break
         else:
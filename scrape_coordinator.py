@@ -0,0 +1,418 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from multiprocessing import Process
+
+from catalog_store import DEFAULT_CATALOG_PATH
+from db_connection import connect, write_transaction
+from metacritc import refresh_catalog, scrape_multiple_games, save_to_csv
+
+# Constants
+DEFAULT_DB_PATH = "scrape_jobs.db"
+DEFAULT_OUTPUT_DIR = "shards"
+DEFAULT_SHARD_SIZE = 25
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker_id TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_shards_status ON shards (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_shards_job ON shards (job_id, status);
+"""
+
+
+class ScrapeCoordinator:
+    """
+    Durable work queue that hands out URL shards to scrape workers.
+
+    Shards are leased to one worker at a time. A worker must heartbeat
+    before its lease expires; expired leases are put back in the queue
+    until a shard has been attempted max_attempts times, after which it
+    is marked as failed.
+
+    The queue and the shard outputs live on the local filesystem, so all
+    workers must run on the same host: SQLite in WAL mode cannot be shared
+    over a network filesystem, and output paths are local to the worker.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        with connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def submit(self, urls, shard_size=DEFAULT_SHARD_SIZE):
+        """Split urls into shards and enqueue them. Returns the new job id."""
+        job_id = uuid.uuid4().hex
+        shards = [urls[i:i + shard_size] for i in range(0, len(urls), shard_size)]
+
+        with write_transaction(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO shards (job_id, urls) VALUES (?, ?)",
+                [(job_id, json.dumps(shard)) for shard in shards]
+            )
+
+        logging.info(f"Submitted job {job_id}: {len(urls)} URLs in {len(shards)} shards")
+        return job_id
+
+    def lease(self, worker_id, job_id=None):
+        """
+        Lease the oldest pending shard to worker_id.
+        Returns (shard_id, urls) or None when nothing is available.
+        """
+        now = time.time()
+        with write_transaction(self.db_path) as conn:
+            self._expire_leases(conn, now)
+
+            query = "SELECT id, urls FROM shards WHERE status = 'pending'"
+            params = []
+            if job_id is not None:
+                query += " AND job_id = ?"
+                params.append(job_id)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                """UPDATE shards
+                   SET status = 'leased', worker_id = ?, lease_expires = ?,
+                       attempts = attempts + 1
+                   WHERE id = ?""",
+                (worker_id, now + self.lease_seconds, row["id"])
+            )
+
+        return row["id"], json.loads(row["urls"])
+
+    def _expire_leases(self, conn, now):
+        """Return shards with expired leases to the queue, or fail them."""
+        conn.execute(
+            """UPDATE shards
+               SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   worker_id = NULL, lease_expires = NULL,
+                   error = 'lease expired'
+               WHERE status = 'leased' AND lease_expires < ?""",
+            (self.max_attempts, now)
+        )
+
+    def heartbeat(self, shard_id, worker_id):
+        """Extend a lease. Returns False if the worker no longer holds it."""
+        with write_transaction(self.db_path) as conn:
+            cursor = conn.execute(
+                """UPDATE shards SET lease_expires = ?
+                   WHERE id = ? AND worker_id = ? AND status = 'leased'""",
+                (time.time() + self.lease_seconds, shard_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id, worker_id, output_path, failed_urls=None):
+        """
+        Mark a leased shard as done. Returns False if the lease was lost.
+
+        failed_urls are re-enqueued as a new shard that inherits the attempt
+        count, so they are retried until max_attempts and then marked failed.
+        """
+        with write_transaction(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT job_id, attempts FROM shards WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (shard_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+
+            conn.execute(
+                """UPDATE shards
+                   SET status = 'done', output_path = ?, lease_expires = NULL, error = NULL
+                   WHERE id = ?""",
+                (output_path, shard_id)
+            )
+            if failed_urls:
+                retry = row["attempts"] < self.max_attempts
+                conn.execute(
+                    """INSERT INTO shards (job_id, urls, status, attempts, error)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (row["job_id"], json.dumps(failed_urls), "pending" if retry else "failed",
+                     row["attempts"], f"{len(failed_urls)} URLs failed to scrape")
+                )
+        return True
+
+    def release(self, shard_id, worker_id, error=None):
+        """Give a shard back after a worker error so it can be retried."""
+        with write_transaction(self.db_path) as conn:
+            conn.execute(
+                """UPDATE shards
+                   SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                       worker_id = NULL, lease_expires = NULL, error = ?
+                   WHERE id = ? AND worker_id = ? AND status = 'leased'""",
+                (self.max_attempts, error, shard_id, worker_id)
+            )
+
+    def requeue(self, shard_ids, error=None):
+        """Put finished shards back in the queue, e.g. when their output was lost."""
+        with write_transaction(self.db_path) as conn:
+            conn.executemany(
+                """UPDATE shards
+                   SET status = 'pending', worker_id = NULL, output_path = NULL, error = ?
+                   WHERE id = ?""",
+                [(error, shard_id) for shard_id in shard_ids]
+            )
+
+    def progress(self, job_id=None):
+        """Return a dict of shard counts by status."""
+        query = "SELECT status, COUNT(*) AS n FROM shards"
+        params = []
+        if job_id is not None:
+            query += " WHERE job_id = ?"
+            params.append(job_id)
+        with connect(self.db_path) as conn:
+            rows = conn.execute(query + " GROUP BY status", params).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def is_finished(self, job_id=None):
+        """True once no shard is pending or leased."""
+        counts = self.progress(job_id)
+        return counts.get("pending", 0) == 0 and counts.get("leased", 0) == 0
+
+    def merge_outputs(self, job_id=None, filename="output.csv", catalog_path=DEFAULT_CATALOG_PATH,
+                      retired_urls=None):
+        """
+        Merge the per-shard outputs of finished shards into one catalog file
+        and write the records that changed into the catalog store, deleting
+        the games in retired_urls that were not scraped again.
+        Records are deduplicated by URL, later shards winning. Returns the
+        CatalogDelta, for applying to a trained GameRecommender, or None if
+        the catalog could not be updated.
+
+        Raises IOError if a shard output cannot be read; those shards are
+        put back in the queue so that running the workers again redoes them.
+        """
+        query = "SELECT id, output_path FROM shards WHERE status = 'done' AND output_path IS NOT NULL"
+        params = []
+        if job_id is not None:
+            query += " AND job_id = ?"
+            params.append(job_id)
+        with connect(self.db_path) as conn:
+            shards = [(row["id"], row["output_path"])
+                      for row in conn.execute(query + " ORDER BY id", params)]
+
+        merged = {}
+        missing = []
+        for shard_id, path in shards:
+            try:
+                with open(path, "r", newline="", encoding="utf-8") as file:
+                    for record in csv.DictReader(file):
+                        merged[record["URL"]] = record
+            except IOError as e:
+                logging.error(f"Failed to read shard output {path}: {e}")
+                missing.append(shard_id)
+
+        if missing:
+            self.requeue(missing, "shard output missing")
+            raise IOError(f"{len(missing)} shard outputs could not be read and were re-enqueued")
+
+        all_data = list(merged.values())
+        save_to_csv(all_data, filename)
+        return refresh_catalog(all_data, retired_urls, db_path=catalog_path)
+
+
+def _heartbeat_loop(coordinator, shard_id, worker_id, stop_event):
+    interval = max(coordinator.lease_seconds / 3, 0.1)
+    while not stop_event.wait(interval):
+        if not coordinator.heartbeat(shard_id, worker_id):
+            logging.warning(f"Worker {worker_id} lost lease on shard {shard_id}")
+            return
+
+
+def run_worker(db_path=DEFAULT_DB_PATH, output_dir=DEFAULT_OUTPUT_DIR, worker_id=None,
+               job_id=None, max_workers=5, poll_interval=1.0, exit_when_idle=True,
+               lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Lease shards and scrape them until the queue is drained.
+    Each shard is written to its own CSV file in output_dir.
+    """
+    coordinator = ScrapeCoordinator(db_path, lease_seconds, max_attempts)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    os.makedirs(output_dir, exist_ok=True)
+    processed = 0
+
+    while True:
+        leased = coordinator.lease(worker_id, job_id)
+        if leased is None:
+            if exit_when_idle and coordinator.is_finished(job_id):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        shard_id, urls = leased
+        logging.info(f"Worker {worker_id} leased shard {shard_id} ({len(urls)} URLs)")
+
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat_loop,
+            args=(coordinator, shard_id, worker_id, stop_event),
+            daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            all_data = scrape_multiple_games(urls, max_workers=max_workers)
+            # scrape_metacritic logs and swallows fetch errors, so find them here
+            scraped = {record["URL"] for record in all_data}
+            failed_urls = [url for url in urls if url not in scraped]
+
+            # Per-worker file name: a worker that lost its lease can never
+            # overwrite the output recorded by the new lease holder
+            output_path = os.path.join(output_dir, f"shard_{shard_id:06d}_{worker_id}.csv")
+            tmp_path = f"{output_path}.tmp"
+            if all_data:
+                save_to_csv(all_data, tmp_path)
+                # save_to_csv logs write errors instead of raising them
+                if not os.path.exists(tmp_path):
+                    raise IOError(f"Could not write shard output {tmp_path}")
+                os.replace(tmp_path, output_path)
+            else:
+                output_path = None
+        except Exception as e:
+            logging.error(f"Worker {worker_id} failed on shard {shard_id}: {e}")
+            coordinator.release(shard_id, worker_id, str(e))
+            continue
+        finally:
+            stop_event.set()
+            heartbeat.join()
+
+        if coordinator.complete(shard_id, worker_id, output_path, failed_urls):
+            processed += 1
+            if failed_urls:
+                logging.warning(f"Shard {shard_id}: {len(failed_urls)} URLs failed to scrape")
+        else:
+            logging.warning(f"Discarding output of shard {shard_id}: lease was taken over")
+            if output_path is not None:
+                os.remove(output_path)
+
+    logging.info(f"Worker {worker_id} finished after {processed} shards.")
+    return processed
+
+
+def run_local_workers(n_workers=4, **worker_kwargs):
+    """Run n_workers worker processes on this machine and wait for them."""
+    processes = [
+        Process(target=run_worker, kwargs=worker_kwargs)
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def scrape_distributed(urls, n_workers=4, shard_size=DEFAULT_SHARD_SIZE,
+                       db_path=DEFAULT_DB_PATH, output_dir=DEFAULT_OUTPUT_DIR,
+                       filename="output.csv", catalog_path=DEFAULT_CATALOG_PATH, max_workers=5,
+                       retired_urls=None):
+    """
+    Shard urls, scrape them with local worker processes and merge the
+    results into filename. Returns the CatalogDelta from merge_outputs.
+    """
+    coordinator = ScrapeCoordinator(db_path)
+    job_id = coordinator.submit(urls, shard_size)
+    run_local_workers(
+        n_workers,
+        db_path=db_path,
+        output_dir=output_dir,
+        job_id=job_id,
+        max_workers=max_workers
+    )
+
+    counts = coordinator.progress(job_id)
+    if counts.get("failed"):
+        logging.warning(f"{counts['failed']} shards failed after {coordinator.max_attempts} attempts")
+    return coordinator.merge_outputs(job_id, filename, catalog_path, retired_urls)
+
+
+def _read_urls(path):
+    with open(path, "r") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sharded Metacritic scraping with several worker processes. "
+                    "The job queue is a local SQLite file, so every worker must run "
+                    "on the same host as the queue."
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the job queue database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit = subparsers.add_parser("submit", help="Enqueue URLs from a file")
+    submit.add_argument("url_file")
+    submit.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+
+    work = subparsers.add_parser("work", help="Run a worker against the queue")
+    work.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    work.add_argument("--threads", type=int, default=5)
+    work.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+
+    merge = subparsers.add_parser("merge", help="Merge shard outputs into a catalog file")
+    merge.add_argument("--output", default="output.csv")
+    merge.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+    merge.add_argument("--retire", metavar="FILE", help="Delete the games listed in FILE from the catalog")
+
+    run = subparsers.add_parser("run", help="Submit, scrape with local workers and merge")
+    run.add_argument("url_file")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    run.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    run.add_argument("--output", default="output.csv")
+    run.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+    run.add_argument("--retire", metavar="FILE", help="Delete the games listed in FILE from the catalog")
+
+    subparsers.add_parser("status", help="Show shard counts by status")
+
+    args = parser.parse_args()
+
+    if args.command in ("submit", "run"):
+        urls = _read_urls(args.url_file)
+    retired_urls = None
+    if getattr(args, "retire", None):
+        retired_urls = _read_urls(args.retire)
+
+    if args.command == "submit":
+        ScrapeCoordinator(args.db).submit(urls, args.shard_size)
+    elif args.command == "work":
+        run_worker(args.db, args.output_dir, max_workers=args.threads,
+                   exit_when_idle=not args.wait)
+    elif args.command == "merge":
+        delta = ScrapeCoordinator(args.db).merge_outputs(filename=args.output, catalog_path=args.catalog,
+                                                         retired_urls=retired_urls)
+    elif args.command == "run":
+        delta = scrape_distributed(urls, n_workers=args.workers, shard_size=args.shard_size,
+                           db_path=args.db, output_dir=args.output_dir, filename=args.output,
+                           catalog_path=args.catalog, retired_urls=retired_urls)
+    elif args.command == "status":
+        print(ScrapeCoordinator(args.db).progress())
+
+    if args.command in ("merge", "run") and delta is not None:
+        print(delta.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import hashlib
+
+import numpy as np
+
+# Number of distinct genre/platform filter values whose matches are cached
+MATCH_CACHE_SIZE = 128
+
+
+def _intern(values):
+    """Return (table, codes): the distinct strings and an int32 code per value."""
+    table = []
+    lookup = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        value = value if isinstance(value, str) else ''
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(table)
+            table.append(value)
+        codes[i] = code
+    return table, codes
+
+
+def _intern_into(table, values):
+    """Codes for values in an existing table, appending strings not yet in it."""
+    lookup = {value: code for code, value in enumerate(table)}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        value = value if isinstance(value, str) else ''
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(table)
+            table.append(value)
+        codes[i] = code
+    return codes
+
+
+def _url_keys(urls):
+    """64-bit keys identifying games by URL without keeping the URL strings."""
+    keys = np.empty(len(urls), dtype=np.int64)
+    for i, url in enumerate(urls):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+        keys[i] = int.from_bytes(digest, 'little', signed=True)
+    return keys
+
+
+def _normalise(features):
+    features = np.array(features, dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    np.divide(features, norms, out=features, where=norms > 0)
+    return features
+
+
+def _item_sets(table):
+    """Lower-cased item sets for a table of comma-separated lists."""
+    return [
+        frozenset(item.strip().lower() for item in entry.split(',') if item.strip())
+        for entry in table
+    ]
+
+
+def _wanted_items(wanted):
+    if isinstance(wanted, str):
+        wanted = [wanted]
+    return frozenset(value.lower() for value in wanted)
+
+
+class ServingIndex:
+    """
+    Compact, numeric-only layout of a trained catalog for answering queries.
+
+    Games are stored sorted by cluster, so each cluster is a contiguous
+    slice given by cluster_offsets. Features are L2-normalised float32 rows,
+    so cosine similarity is a single dot product. Strings are interned into
+    small tables and referenced by int32 codes. Games are identified by a
+    64-bit hash of their URL, so a catalog delta can be applied in place.
+    """
+
+    def __init__(self, features, labels, cluster_offsets, rows, keys, metascores, years,
+                 title_table, title_codes, genre_table, genre_codes,
+                 platform_table, platform_codes):
+        self.features = features
+        self.labels = labels
+        self.cluster_offsets = cluster_offsets
+        self.rows = rows
+        self.keys = keys
+        self.metascores = metascores
+        self.years = years
+        self.title_table = title_table
+        self.title_codes = title_codes
+        self.genre_table = genre_table
+        self.genre_codes = genre_codes
+        self.platform_table = platform_table
+        self.platform_codes = platform_codes
+        self._genre_items = _item_sets(genre_table)
+        self._platform_items = _item_sets(platform_table)
+        self._match_cache = {}
+
+    @classmethod
+    def build(cls, features, labels, n_clusters, urls, titles, genres, platforms, metascores, years):
+        """Build the index from per-game arrays in catalog row order."""
+        labels = np.asarray(labels, dtype=np.int32)
+        # Stable sort keeps catalog order within each cluster
+        order = np.argsort(labels, kind='stable').astype(np.int32)
+
+        features = _normalise(np.asarray(features)[order])
+
+        sorted_labels = labels[order]
+        cluster_offsets = np.searchsorted(
+            sorted_labels, np.arange(n_clusters + 1, dtype=np.int32)
+        ).astype(np.int32)
+
+        title_table, title_codes = _intern([titles[i] for i in order])
+        genre_table, genre_codes = _intern([genres[i] for i in order])
+        platform_table, platform_codes = _intern([platforms[i] for i in order])
+
+        return cls(
+            features=np.ascontiguousarray(features),
+            labels=sorted_labels,
+            cluster_offsets=cluster_offsets,
+            rows=order,
+            keys=_url_keys([urls[i] for i in order]),
+            metascores=np.asarray(metascores, dtype=np.float32)[order],
+            years=np.asarray(years, dtype=np.float32)[order],
+            title_table=title_table,
+            title_codes=title_codes,
+            genre_table=genre_table,
+            genre_codes=genre_codes,
+            platform_table=platform_table,
+            platform_codes=platform_codes
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def update(self, removed_urls, features, labels, urls, titles, genres, platforms,
+               metascores, years):
+        """
+        Apply a catalog delta in place of a rebuild: drop the games in
+        removed_urls, then insert the given games into their clusters.
+
+        A game that is both removed and inserted (an update) keeps its place
+        in catalog order; new games go after every existing game. Rows are
+        inserted where build() would have put them, and only the new feature
+        rows are normalised. Interned strings no longer referenced stay in
+        their tables until the next build.
+        """
+        keys = _url_keys(urls)
+        removed = np.isin(self.keys, _url_keys(removed_urls))
+        kept_rows = dict(zip(self.keys[removed].tolist(), self.rows[removed].tolist()))
+
+        next_row = int(self.rows.max()) + 1 if len(self.rows) else 0
+        rows = np.empty(len(keys), dtype=np.int32)
+        for i, key in enumerate(keys.tolist()):
+            row = kept_rows.get(key)
+            if row is None:
+                row, next_row = next_row, next_row + 1
+            rows[i] = row
+
+        keep = ~removed
+        self.features = self.features[keep]
+        self.labels = self.labels[keep]
+        self.rows = self.rows[keep]
+        self.keys = self.keys[keep]
+        self.metascores = self.metascores[keep]
+        self.years = self.years[keep]
+        self.title_codes = self.title_codes[keep]
+        self.genre_codes = self.genre_codes[keep]
+        self.platform_codes = self.platform_codes[keep]
+
+        n_clusters = len(self.cluster_offsets) - 1
+        offsets = np.searchsorted(self.labels, np.arange(n_clusters + 1, dtype=np.int32))
+
+        # Each new game goes to its catalog-order place within its cluster;
+        # inserting in (cluster, row) order keeps games sharing a place ordered
+        labels = np.asarray(labels, dtype=np.int32)
+        order = np.lexsort((rows, labels))
+        labels, rows, keys = labels[order], rows[order], keys[order]
+        positions = np.array(
+            [offsets[label] + np.searchsorted(self.rows[offsets[label]:offsets[label + 1]], row)
+             for label, row in zip(labels, rows)],
+            dtype=np.intp
+        )
+
+        genre_count, platform_count = len(self.genre_table), len(self.platform_table)
+        title_codes = _intern_into(self.title_table, [titles[i] for i in order])
+        genre_codes = _intern_into(self.genre_table, [genres[i] for i in order])
+        platform_codes = _intern_into(self.platform_table, [platforms[i] for i in order])
+        self._genre_items.extend(_item_sets(self.genre_table[genre_count:]))
+        self._platform_items.extend(_item_sets(self.platform_table[platform_count:]))
+        self._match_cache.clear()
+
+        features = np.asarray(features, dtype=np.float32).reshape(len(keys), self.features.shape[1])
+        features = _normalise(features[order])
+        self.features = np.ascontiguousarray(np.insert(self.features, positions, features, axis=0))
+        self.labels = np.insert(self.labels, positions, labels)
+        self.rows = np.insert(self.rows, positions, rows)
+        self.keys = np.insert(self.keys, positions, keys)
+        self.metascores = np.insert(
+            self.metascores, positions, np.asarray(metascores, dtype=np.float32)[order]
+        )
+        self.years = np.insert(self.years, positions, np.asarray(years, dtype=np.float32)[order])
+        self.title_codes = np.insert(self.title_codes, positions, title_codes)
+        self.genre_codes = np.insert(self.genre_codes, positions, genre_codes)
+        self.platform_codes = np.insert(self.platform_codes, positions, platform_codes)
+
+        self.cluster_offsets = np.searchsorted(
+            self.labels, np.arange(n_clusters + 1, dtype=np.int32)
+        ).astype(np.int32)
+
+    def find(self, title):
+        """Position of the first game (in catalog order) whose title contains title, or None."""
+        needle = title.casefold()
+        matches = np.array([needle in entry.casefold() for entry in self.title_table], dtype=bool)
+        hits = np.flatnonzero(matches[self.title_codes])
+        if len(hits) == 0:
+            return None
+        return hits[np.argmin(self.rows[hits])]
+
+    def _table_matches(self, item_sets, wanted):
+        """
+        Boolean array over a string table: True where the entry contains any
+        wanted item. Cached per filter value, so a query only gathers codes.
+        """
+        key = (id(item_sets), _wanted_items(wanted))
+        matches = self._match_cache.get(key)
+        if matches is None:
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            matches = np.array([not key[1].isdisjoint(items) for items in item_sets], dtype=bool)
+            self._match_cache[key] = matches
+        return matches
+
+    def cluster_range(self, position):
+        """(start, end) positions of the cluster containing position."""
+        label = self.labels[position]
+        return self.cluster_offsets[label], self.cluster_offsets[label + 1]
+
+    def filter_positions(self, start=0, end=None, platforms=None, genres=None,
+                         min_metascore=None, max_metascore=None, min_year=None, max_year=None):
+        """
+        Sorted positions in [start, end) of games matching every filter, or
+        None if no filter was given. Only the slice is examined, so filtering
+        a cluster costs no more than scoring it.
+        """
+        if end is None:
+            end = len(self)
+        mask = None
+
+        def narrow(condition):
+            return condition if mask is None else mask & condition
+
+        if platforms is not None:
+            mask = narrow(
+                self._table_matches(self._platform_items, platforms)[self.platform_codes[start:end]]
+            )
+        if genres is not None:
+            mask = narrow(
+                self._table_matches(self._genre_items, genres)[self.genre_codes[start:end]]
+            )
+        if min_metascore is not None:
+            mask = narrow(self.metascores[start:end] >= min_metascore)
+        if max_metascore is not None:
+            mask = narrow(self.metascores[start:end] <= max_metascore)
+        if min_year is not None:
+            mask = narrow(self.years[start:end] >= min_year)
+        if max_year is not None:
+            mask = narrow(self.years[start:end] <= max_year)
+
+        if mask is None:
+            return None
+        return start + np.flatnonzero(mask)
+
+    def most_similar(self, position, n, candidates=None):
+        """
+        Top n games in the same cluster as position, excluding itself.
+        candidates, if given, is a sorted array of positions to restrict to.
+        Returns (positions, similarities) ordered by decreasing similarity.
+        """
+        start, end = self.cluster_range(position)
+
+        if candidates is None:
+            cluster = np.arange(start, end)
+        else:
+            lo, hi = np.searchsorted(candidates, [start, end])
+            cluster = candidates[lo:hi]
+        cluster = cluster[cluster != position]
+
+        if len(cluster) == 0 or n <= 0:
+            return cluster[:0], np.empty(0, dtype=np.float32)
+
+        similarities = self.features[cluster] @ self.features[position]
+
+        if len(cluster) > n:
+            top = np.argpartition(-similarities, n - 1)[:n]
+        else:
+            top = np.arange(len(cluster))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return cluster[top], similarities[top]
+
+    def title(self, position):
+        return self.title_table[self.title_codes[position]]
+
+    def genres(self, position):
+        return self.genre_table[self.genre_codes[position]]
+
+    def metascore(self, position):
+        return self.metascores[position]
@@ -0,0 +1,121 @@
+import csv
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metacritc
+from catalog_store import CatalogStore
+
+GENRES = ["Action", "RPG", "Puzzle", "Shooter", "Strategy", "Sports", "Horror", "Racing"]
+PLATFORMS = ["PlayStation 5", "PC", "Xbox Series X", "Switch"]
+MONTHS = ["Jan", "Mar", "Jun", "Sep", "Nov"]
+
+
+GAME_PAGE = """<html><body>
+<div class="c-productHero_score-container"><h1>{title}</h1></div>
+<div class="c-siteReviewScore_background"><span>85</span></div>
+<ul class="c-genreList"><li><span class="c-globalButton_label">Action</span></li></ul>
+</body></html>"""
+
+
+class StubMetacritic(BaseHTTPRequestHandler):
+    """
+    Serves a minimal game page for every path. Paths starting with /fail
+    always return 500; paths starting with /flaky return 500 on the first
+    request only.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+
+        if self.path.startswith("/fail") or (self.path.startswith("/flaky") and hits == 1):
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(GAME_PAGE.format(title=f"Game {self.path}").encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMetacritic)
+    server.lock = threading.Lock()
+    server.hits = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_scrape_delay(monkeypatch):
+    # scrape_metacritic sleeps 1-3 seconds per URL to be polite to the real site
+    monkeypatch.setattr(metacritc, "time", SimpleNamespace(sleep=lambda seconds: None))
+
+
+def _make_records(n, seed=0):
+    """Synthetic scraped records shaped like metacritc.scrape_metacritic output."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        records.append({
+            "URL": f"https://www.metacritic.com/game/game-{i}/",
+            "Title": f"Game {i} Saga",
+            "Metascore": rng.choice([str(rng.randint(40, 98))] * 9 + ["tbd"]),
+            "User Score": str(round(rng.uniform(3, 9.5), 1)),
+            "Publisher": "Publisher",
+            "Developers": "Developer",
+            "Genres": ", ".join(rng.sample(GENRES, 2)),
+            "Release Date": f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {rng.randint(2005, 2024)}",
+            "Platforms": ", ".join(rng.sample(PLATFORMS, 2)),
+        })
+    return records
+
+
+def _write_csv(records, path):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=records[0].keys())
+        writer.writeheader()
+        writer.writerows(records)
+    return str(path)
+
+
+def _write_catalog(records, path):
+    CatalogStore(str(path)).upsert(records)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def make_records():
+    """Factory for synthetic records: make_records(n, seed=0)."""
+    return _make_records
+
+
+@pytest.fixture(scope="session")
+def write_csv():
+    """Factory writing records to an output.csv-style file; returns its path."""
+    return _write_csv
+
+
+@pytest.fixture(scope="session")
+def write_catalog():
+    """Factory writing records to a catalog database; returns its path."""
+    return _write_catalog
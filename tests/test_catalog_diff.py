@@ -0,0 +1,129 @@
+import copy
+
+import pytest
+
+from catalog_diff import apply_delta, diff_records
+from catalog_store import CatalogStore
+from game_recommender import GameRecommender
+from metacritc import refresh_catalog
+
+
+@pytest.fixture
+def records(make_records):
+    return make_records(120)
+
+
+@pytest.fixture
+def store(records, tmp_path, write_catalog):
+    return CatalogStore(write_catalog(records, tmp_path / "catalog.db"))
+
+
+def test_unchanged_refresh_is_empty(store, records):
+    delta = diff_records(store, records)
+
+    assert not delta
+    assert delta.unchanged == len(records)
+
+
+def test_detects_inserts_and_updates(store, records):
+    refreshed = copy.deepcopy(records[:10])
+    refreshed[3]["Metascore"] = "99"
+    new_game = dict(refreshed[0], URL="https://www.metacritic.com/game/new/", Title="New Game")
+    refreshed.append(new_game)
+
+    delta = diff_records(store, refreshed)
+
+    assert delta.inserts == [new_game]
+    assert delta.updates == [refreshed[3]]
+    assert delta.deletes == []
+    assert delta.unchanged == 9
+    assert delta.summary() == "1 inserted, 1 updated, 0 deleted, 9 unchanged"
+
+
+def test_duplicate_urls_keep_last_record(store, records):
+    first = dict(records[5], Metascore="10")
+    last = dict(records[5], Metascore="11")
+
+    delta = diff_records(store, [first, records[6], last])
+
+    assert delta.updates == [last]
+    assert delta.unchanged == 1
+
+
+def test_deletes_only_for_retired_urls(store, records):
+    refreshed = records[:10]
+
+    assert diff_records(store, refreshed).deletes == []
+
+    retired = [records[50]["URL"], records[60]["URL"], records[2]["URL"], "https://unknown/"]
+    delta = diff_records(store, refreshed, retired_urls=retired)
+
+    # records[2] was re-scraped in this refresh and unknown URLs are not stored
+    assert delta.deletes == [records[50]["URL"], records[60]["URL"]]
+
+
+def test_apply_delta_writes_only_changes(store, records):
+    refreshed = copy.deepcopy(records)
+    refreshed[0]["Title"] = "Renamed"
+    retired = refreshed.pop(1)
+    delta = diff_records(store, refreshed, retired_urls=[retired["URL"]])
+
+    apply_delta(store, delta)
+
+    assert store.count() == len(records) - 1
+    assert store.load_records(urls=[records[0]["URL"]])[0]["Title"] == "Renamed"
+    assert not diff_records(store, refreshed)
+
+
+def test_refresh_catalog_reports_delta(records, tmp_path, write_catalog):
+    db_path = write_catalog(records, tmp_path / "catalog.db")
+    refreshed = copy.deepcopy(records[:3])
+    refreshed[1]["Genres"] = "Puzzle"
+
+    delta = refresh_catalog(refreshed, db_path=db_path)
+
+    assert delta.summary() == "0 inserted, 1 updated, 0 deleted, 2 unchanged"
+    assert not refresh_catalog(refreshed, db_path=db_path)
+
+
+def test_updated_game_moves_to_nearest_cluster(store, records):
+    recommender = GameRecommender(catalog_path=store.db_path)
+    recommender.train_model(n_clusters=4, keep_training_data=True)
+    df = recommender.df
+    moved = df.iloc[0]
+    target = df[df["Cluster"] != moved["Cluster"]].iloc[0]
+
+    # Give the first game the content of a game from another cluster
+    updated = dict(records[int(target.name)], URL=moved["URL"], Title=moved["Title"])
+    delta = refresh_catalog([updated], db_path=store.db_path)
+    recommender.apply_delta(delta)
+
+    index = recommender.serving_index
+    assert index.labels[index.find(moved["Title"])] == target["Cluster"]
+    assert len(index) == len(records)
+    recommended = recommender.get_recommendations(moved["Title"], len(index))
+    assert target["Title"] in {rec["title"] for rec in recommended}
+
+
+def test_csv_and_catalog_recommenders_agree_after_delta(records, tmp_path, write_catalog, write_csv):
+    db_path = write_catalog(records, tmp_path / "catalog.db")
+    csv_backed = GameRecommender(write_csv(records, tmp_path / "output.csv"))
+    catalog_backed = GameRecommender(catalog_path=db_path)
+    csv_backed.train_model(n_clusters=4)
+    catalog_backed.train_model(n_clusters=4)
+
+    refreshed = copy.deepcopy(records)
+    refreshed[3]["Metascore"] = "97"
+    refreshed[10]["Genres"] = "Puzzle, Horror"
+    refreshed.append(dict(refreshed[0], URL="https://www.metacritic.com/game/new/", Title="Brand New Game"))
+    del refreshed[20]
+    delta = refresh_catalog(refreshed, retired_urls=[records[20]["URL"]], db_path=db_path)
+    assert delta.summary() == "1 inserted, 2 updated, 1 deleted, 117 unchanged"
+
+    csv_backed.apply_delta(delta)
+    catalog_backed.apply_delta(delta)
+
+    assert len(csv_backed.serving_index) == len(catalog_backed.serving_index) == len(records)
+    assert csv_backed.get_recommendations(records[20]["Title"]) is None
+    for title in ["Brand New Game", records[3]["Title"], records[10]["Title"], "Game 77 Saga"]:
+        assert csv_backed.get_recommendations(title, 10) == catalog_backed.get_recommendations(title, 10)
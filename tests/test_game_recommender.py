@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from db_connection import connect
+from game_recommender import GameRecommender
+
+FILTERS = [
+    {"platforms": "PC"},
+    {"genres": ["rpg", "Puzzle"]},
+    {"min_metascore": 70, "max_year": 2015},
+    {"platforms": "Switch", "min_year": 2010},
+]
+
+
+@pytest.fixture(scope="module")
+def records(make_records):
+    return make_records(400)
+
+
+@pytest.fixture(scope="module")
+def recommenders(records, tmp_path_factory, write_csv, write_catalog):
+    tmp_path = tmp_path_factory.mktemp("catalog")
+    csv_backed = GameRecommender(write_csv(records, tmp_path / "output.csv"))
+    catalog_backed = GameRecommender(catalog_path=write_catalog(records, tmp_path / "catalog.db"))
+    csv_backed.train_model(keep_training_data=True)
+    catalog_backed.train_model()
+    return csv_backed, catalog_backed
+
+
+def _matches(row, platforms=None, genres=None, min_metascore=None, max_metascore=None,
+             min_year=None, max_year=None):
+    for column, wanted in [("Platforms", platforms), ("Genres", genres)]:
+        if wanted is not None:
+            wanted = {wanted.lower()} if isinstance(wanted, str) else {w.lower() for w in wanted}
+            items = {item.strip().lower() for item in str(row[column]).split(",")}
+            if not wanted & items:
+                return False
+    for column, lower, upper in [("Metascore", min_metascore, max_metascore),
+                                 ("Release Year", min_year, max_year)]:
+        if lower is not None and not row[column] >= lower:
+            return False
+        if upper is not None and not row[column] <= upper:
+            return False
+    return True
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_filtered_recommendations_match_post_filtering(recommenders, filters):
+    recommender = recommenders[0]
+    df = recommender.df
+    game = df[df["Title"] == "Game 12 Saga"].iloc[0]
+
+    cluster = df[(df["Cluster"] == game["Cluster"]) & (df["Title"] != game["Title"])]
+    expected = {row["Title"] for _, row in cluster.iterrows() if _matches(row, **filters)}
+
+    recommendations = recommender.get_recommendations("Game 12 Saga", len(df), **filters)
+
+    assert {rec["title"] for rec in recommendations} == expected
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_csv_and_catalog_backends_agree(recommenders, filters):
+    csv_backed, catalog_backed = recommenders
+    for title in ["Game 12 Saga", "Game 250 Saga"]:
+        csv_titles = [rec["title"] for rec in csv_backed.get_recommendations(title, 10, **filters)]
+        catalog_titles = [rec["title"] for rec in catalog_backed.get_recommendations(title, 10, **filters)]
+        assert csv_titles == catalog_titles
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_filter_candidates_stay_within_the_query_cluster(recommenders, filters):
+    recommender = recommenders[1]
+    index = recommender.serving_index
+
+    for title in ["Game 12 Saga", "Game 250 Saga", "Game 399 Saga"]:
+        position = index.find(title)
+        start, end = index.cluster_range(position)
+
+        candidates = recommender._filter_candidates(position, **filters)
+
+        # Filtering only ever examines the cluster slice that is scored anyway
+        assert np.all((candidates >= start) & (candidates < end))
+        assert list(candidates) == sorted(candidates)
+        whole_index = index.filter_positions(**filters)
+        assert list(candidates) == [p for p in whole_index if start <= p < end]
+
+
+def test_training_keeps_only_the_serving_index_by_default(recommenders, records, tmp_path, write_csv):
+    recommender = GameRecommender(write_csv(records, tmp_path / "output.csv"))
+    recommender.train_model()
+
+    assert recommender.df is None and recommender.feature_matrix is None
+    with pytest.raises(ValueError):
+        recommender.analyze_clusters()
+    expected = recommenders[0].get_recommendations("Game 12 Saga", 10)
+    recommendations = recommender.get_recommendations("game 12 SAGA", 10)
+    assert [(rec["title"], rec["similarity_score"]) for rec in recommendations] == \
+        [(rec["title"], rec["similarity_score"]) for rec in expected]
+
+    # Retraining reloads the catalog
+    recommender.train_model(keep_training_data=True)
+    assert len(recommender.df) == len(records)
+    assert len(recommender.analyze_clusters()) == recommender.n_clusters
+
+
+def test_backends_parse_release_years_the_same_way(tmp_path, make_records, write_csv, write_catalog):
+    records = make_records(60, seed=3)
+    formats = ["Nov 10, 2017", "2019-05-01", "March 3, 2012", "TBA 2021", "Not found"]
+    for i, record in enumerate(records):
+        record["Release Date"] = formats[i % len(formats)]
+
+    csv_backed = GameRecommender(write_csv(records, tmp_path / "output.csv"))
+    catalog_backed = GameRecommender(catalog_path=write_catalog(records, tmp_path / "catalog.db"))
+    csv_backed.preprocess_data()
+    catalog_backed.preprocess_data()
+
+    years = csv_backed.df["Release Year"].tolist()
+    assert years[:5] == [2017, 2019, 2012, 2021, pytest.approx(float("nan"), nan_ok=True)]
+    assert catalog_backed.df["Release Year"].equals(csv_backed.df["Release Year"])
+
+    with connect(catalog_backed.catalog.db_path) as conn:
+        stored = {row["url"]: row["release_year"] for row in conn.execute("SELECT url, release_year FROM games")}
+    for url, year in zip(csv_backed.df["URL"], years):
+        assert stored[url] == (None if year != year else year)
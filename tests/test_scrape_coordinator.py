@@ -0,0 +1,216 @@
+import csv
+import os
+import sqlite3
+import time
+from multiprocessing import Process
+
+import pytest
+
+import scrape_coordinator
+from catalog_store import CatalogStore
+from scrape_coordinator import ScrapeCoordinator, run_worker, scrape_distributed
+
+
+def _lease_and_die(db_path, lease_seconds):
+    ScrapeCoordinator(db_path, lease_seconds=lease_seconds).lease("dead-worker")
+    os._exit(1)
+
+
+def _attempts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT attempts FROM shards ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _write_shard(path, records):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=["URL", "Title"])
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def test_scrape_distributed_with_multiple_processes(stub_server, tmp_path):
+    urls = [f"{stub_server.url}/game/{i}" for i in range(23)]
+
+    delta = scrape_distributed(
+        urls,
+        n_workers=3,
+        shard_size=4,
+        db_path=str(tmp_path / "jobs.db"),
+        output_dir=str(tmp_path / "shards"),
+        filename=str(tmp_path / "output.csv"),
+        catalog_path=str(tmp_path / "catalog.db"),
+        max_workers=2
+    )
+
+    assert sorted(delta.changed_urls()) == sorted(urls)
+    assert delta.summary() == "23 inserted, 0 updated, 0 deleted, 0 unchanged"
+    assert ScrapeCoordinator(str(tmp_path / "jobs.db")).progress() == {"done": 6}
+    with open(tmp_path / "output.csv", newline="", encoding="utf-8") as file:
+        assert len(list(csv.DictReader(file))) == len(urls)
+
+
+def test_expired_lease_is_released_to_another_worker(stub_server, tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    urls = [f"{stub_server.url}/game/{i}" for i in range(3)]
+    ScrapeCoordinator(db_path).submit(urls, shard_size=10)
+
+    dead = Process(target=_lease_and_die, args=(db_path, 0.3))
+    dead.start()
+    dead.join()
+
+    processed = run_worker(
+        db_path, str(tmp_path / "shards"), worker_id="survivor",
+        poll_interval=0.05, lease_seconds=0.3
+    )
+
+    coordinator = ScrapeCoordinator(db_path)
+    assert processed == 1
+    assert coordinator.progress() == {"done": 1}
+    assert _attempts(db_path) == [2]
+    delta = coordinator.merge_outputs(
+        filename=str(tmp_path / "output.csv"), catalog_path=str(tmp_path / "catalog.db")
+    )
+    assert sorted(delta.changed_urls()) == sorted(urls)
+
+
+def test_lost_lease_cannot_complete(tmp_path):
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"), lease_seconds=0.05)
+    coordinator.submit(["a"])
+
+    shard_id, _ = coordinator.lease("slow")
+    time.sleep(0.1)
+    assert coordinator.lease("fast")[0] == shard_id
+
+    assert not coordinator.heartbeat(shard_id, "slow")
+    assert not coordinator.complete(shard_id, "slow", "slow.csv")
+    assert coordinator.complete(shard_id, "fast", "fast.csv")
+
+
+def test_shard_fails_after_max_attempts(tmp_path):
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"), lease_seconds=0.05, max_attempts=2)
+    coordinator.submit(["a"])
+
+    assert coordinator.lease("w1") is not None
+    time.sleep(0.1)
+    assert coordinator.lease("w2") is not None
+    time.sleep(0.1)
+    assert coordinator.lease("w3") is None
+    assert coordinator.progress() == {"failed": 1}
+
+
+def test_released_shard_fails_after_max_attempts(tmp_path):
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"), max_attempts=2)
+    coordinator.submit(["a"])
+
+    shard_id, _ = coordinator.lease("w1")
+    coordinator.release(shard_id, "w1", "boom")
+    assert coordinator.progress() == {"pending": 1}
+
+    shard_id, _ = coordinator.lease("w1")
+    coordinator.release(shard_id, "w1", "boom")
+    assert coordinator.progress() == {"failed": 1}
+
+
+def test_failed_urls_are_retried_then_marked_failed(stub_server, tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    ok, flaky, broken = (f"{stub_server.url}/{path}" for path in ("ok", "flaky", "fail"))
+    ScrapeCoordinator(db_path).submit([ok, flaky, broken])
+
+    run_worker(db_path, str(tmp_path / "shards"), poll_interval=0.05, max_attempts=2)
+
+    coordinator = ScrapeCoordinator(db_path)
+    assert coordinator.progress() == {"done": 2, "failed": 1}
+    assert stub_server.hits["/fail"] == 2
+    delta = coordinator.merge_outputs(
+        filename=str(tmp_path / "output.csv"), catalog_path=str(tmp_path / "catalog.db")
+    )
+    assert sorted(delta.changed_urls()) == sorted([ok, flaky])
+
+
+def test_merge_outputs_deduplicates_by_url(tmp_path):
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"))
+    coordinator.submit(["a", "b", "c"], shard_size=2)
+
+    for title in ("first", "second"):
+        shard_id, urls = coordinator.lease("w1")
+        path = str(tmp_path / f"shard_{shard_id}.csv")
+        _write_shard(path, [{"URL": url, "Title": title} for url in urls] + [{"URL": "b", "Title": title}])
+        assert coordinator.complete(shard_id, "w1", path)
+
+    delta = coordinator.merge_outputs(
+        filename=str(tmp_path / "output.csv"), catalog_path=str(tmp_path / "catalog.db")
+    )
+
+    assert sorted(delta.changed_urls()) == ["a", "b", "c"]
+    assert {record["URL"]: record["Title"] for record in delta.inserts}["b"] == "second"
+
+
+def test_merge_command_retires_listed_games(tmp_path, monkeypatch, capsys):
+    db_path, catalog_path = str(tmp_path / "jobs.db"), str(tmp_path / "catalog.db")
+    CatalogStore(catalog_path).upsert([{"URL": url, "Title": url} for url in ["a", "b", "c"]])
+    coordinator = ScrapeCoordinator(db_path)
+    coordinator.submit(["b"])
+    shard_id, urls = coordinator.lease("w1")
+    _write_shard(str(tmp_path / "shard.csv"), [{"URL": "b", "Title": "b"}])
+    assert coordinator.complete(shard_id, "w1", str(tmp_path / "shard.csv"))
+    # "b" was scraped again, so only "a" is retired
+    (tmp_path / "retired.txt").write_text("a\nb\n")
+
+    monkeypatch.setattr("sys.argv", [
+        "scrape_coordinator.py", "--db", db_path, "merge", "--output", str(tmp_path / "output.csv"),
+        "--catalog", catalog_path, "--retire", str(tmp_path / "retired.txt")
+    ])
+    scrape_coordinator.main()
+
+    assert "0 inserted, 0 updated, 1 deleted, 1 unchanged" in capsys.readouterr().out
+    assert sorted(CatalogStore(catalog_path).content_hashes()) == ["b", "c"]
+
+
+def test_unwritable_output_releases_shard(stub_server, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "jobs.db")
+    ScrapeCoordinator(db_path, max_attempts=1).submit([f"{stub_server.url}/game/1"])
+    # Mimic save_to_csv swallowing an IOError
+    monkeypatch.setattr(scrape_coordinator, "save_to_csv", lambda data, filename: None)
+
+    processed = run_worker(db_path, str(tmp_path / "shards"), poll_interval=0.05, max_attempts=1)
+
+    assert processed == 0
+    assert ScrapeCoordinator(db_path).progress() == {"failed": 1}
+
+
+def test_merge_outputs_requeues_missing_outputs(tmp_path):
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"))
+    coordinator.submit(["a", "b"], shard_size=1)
+
+    shard_id, urls = coordinator.lease("w1")
+    path = str(tmp_path / "present.csv")
+    _write_shard(path, [{"URL": url, "Title": "ok"} for url in urls])
+    coordinator.complete(shard_id, "w1", path)
+    shard_id, _ = coordinator.lease("w1")
+    coordinator.complete(shard_id, "w1", str(tmp_path / "on-another-host.csv"))
+
+    with pytest.raises(IOError):
+        coordinator.merge_outputs(
+            filename=str(tmp_path / "output.csv"), catalog_path=str(tmp_path / "catalog.db")
+        )
+
+    assert coordinator.progress() == {"done": 1, "pending": 1}
+    assert coordinator.lease("w2") == (shard_id, ["b"])
+    assert not os.path.exists(tmp_path / "output.csv")
+
+
+def test_progress_does_not_take_the_write_lock(tmp_path):
+    from db_connection import write_transaction
+
+    coordinator = ScrapeCoordinator(str(tmp_path / "jobs.db"))
+    coordinator.submit(["a"])
+
+    # With a writer holding the lock, a read must not queue behind it
+    with write_transaction(coordinator.db_path):
+        start = time.perf_counter()
+        assert coordinator.progress() == {"pending": 1}
+        assert coordinator.is_finished() is False
+        assert time.perf_counter() - start < 5
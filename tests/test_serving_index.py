@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+from game_recommender import GameRecommender
+from serving_index import ServingIndex
+
+TITLES = ["Game 0 Saga", "Game 7 Saga", "Game 123 Saga", "Game 299 Saga"]
+
+
+def _dataframe_recommendations(recommender, game_title, n_recommendations=5):
+    """The DataFrame-based lookup that the serving index replaced."""
+    df = recommender.df
+    game_idx = df[df['Title'].str.contains(game_title, case=False, na=False)].index[0]
+    cluster_games = df[df['Cluster'] == df.loc[game_idx, 'Cluster']]
+
+    game_features = recommender.feature_matrix.iloc[game_idx].values.reshape(1, -1)
+    cluster_features = recommender.feature_matrix.iloc[cluster_games.index]
+    similarities = cosine_similarity(game_features, cluster_features)[0]
+
+    similar_game_indices = similarities.argsort()[::-1][1:n_recommendations + 1]
+    return [
+        (df.iloc[cluster_games.index[idx]]['Title'], round(similarity * 100, 2))
+        for idx, similarity in zip(similar_game_indices, similarities[similar_game_indices])
+    ]
+
+
+@pytest.fixture
+def recommender(tmp_path, make_records, write_csv):
+    recommender = GameRecommender(write_csv(make_records(300), tmp_path / "output.csv"))
+    recommender.train_model(keep_training_data=True)
+    return recommender
+
+
+@pytest.mark.parametrize("title", TITLES)
+def test_top_recommendations_match_dataframe_lookup(recommender, title):
+    expected = _dataframe_recommendations(recommender, title)
+
+    recommendations = recommender.get_recommendations(title)
+
+    assert [rec['title'] for rec in recommendations] == [title for title, _ in expected]
+    assert [rec['similarity_score'] for rec in recommendations] == pytest.approx(
+        [score for _, score in expected], abs=0.01
+    )
+
+
+def test_layout_is_sorted_by_cluster(recommender):
+    index = recommender.serving_index
+
+    assert index.features.dtype == np.float32
+    assert index.labels.dtype == np.int32
+    assert np.all(np.diff(index.labels) >= 0)
+    for label in range(recommender.n_clusters):
+        start, end = index.cluster_offsets[label], index.cluster_offsets[label + 1]
+        assert np.all(index.labels[start:end] == label)
+    assert index.cluster_offsets[-1] == len(index)
+
+
+def test_queries_after_release_training_data(recommender):
+    expected = {title: recommender.get_recommendations(title) for title in TITLES}
+
+    recommender.release_training_data()
+
+    assert recommender.df is None and recommender.feature_matrix is None
+    for title in TITLES:
+        assert recommender.get_recommendations(title) == expected[title]
+    assert recommender.get_recommendations("No Such Game") is None
+
+
+def _games(n, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "features": rng.normal(size=(n, 6)),
+        "labels": rng.integers(0, 4, n),
+        "urls": [f"https://www.metacritic.com/game/game-{i}/" for i in range(n)],
+        "titles": [f"Game {i} Saga" for i in range(n)],
+        "genres": [", ".join(rng.choice(["Action", "RPG", "Puzzle"], 2, replace=False)) for _ in range(n)],
+        "platforms": [str(rng.choice(["PC", "Switch", "PlayStation 5"])) for _ in range(n)],
+        "metascores": rng.uniform(40, 99, n),
+        "years": rng.integers(2000, 2025, n).astype(float),
+    }
+
+
+def _select(games, rows):
+    return {name: (values[rows] if isinstance(values, np.ndarray) else [values[i] for i in rows])
+            for name, values in games.items()}
+
+
+def test_update_matches_a_rebuild():
+    old = _games(60, seed=1)
+    # Games 5 and 17 change content, game 30 is retired and 50-59 are new
+    current = _games(60, seed=1)
+    replacement = _games(60, seed=2)
+    for name in ("features", "labels", "genres", "platforms", "metascores", "years"):
+        for i in (5, 17):
+            current[name][i] = replacement[name][i]
+
+    index = ServingIndex.build(n_clusters=4, **_select(old, list(range(50))))
+    changed = [5, 17] + list(range(50, 60))
+    index.update(removed_urls=[old["urls"][i] for i in (5, 17, 30)], **_select(current, changed))
+
+    final = [i for i in range(60) if i != 30]
+    expected = ServingIndex.build(n_clusters=4, **_select(current, final))
+
+    assert len(index) == len(expected)
+    for name in ("labels", "cluster_offsets", "keys", "metascores", "years"):
+        assert np.array_equal(getattr(index, name), getattr(expected, name)), name
+    assert np.allclose(index.features, expected.features)
+    assert np.array_equal(np.argsort(index.rows), np.argsort(expected.rows))
+    assert [index.title(p) for p in range(len(index))] == [expected.title(p) for p in range(len(expected))]
+    assert index.find("Game 30 Saga") is None
+    for filters in [{"genres": "Puzzle"}, {"platforms": ["PC", "Switch"], "min_year": 2010}]:
+        assert np.array_equal(index.filter_positions(**filters), expected.filter_positions(**filters))
+    for position in (0, 25, len(index) - 1):
+        assert np.array_equal(index.most_similar(position, 5)[0], expected.most_similar(position, 5)[0])